@@ -1,13 +1,33 @@
 import streamlit as st
+import bisect
+import functools
+import urllib.request
+import heapq
 import json
 import os
-import shutil
+import threading
 import time
 import hashlib
+import hmac
 import re
-from datetime import date, datetime, timedelta
+from datetime import date, timedelta
 from typing import List, Dict, Any
 
+try:
+    import orjson  # optional fast path; stdlib json is the fallback
+except ImportError:
+    orjson = None
+
+try:
+    from argon2 import PasswordHasher
+    from argon2.exceptions import VerificationError
+    try:
+        from argon2.exceptions import InvalidHashError
+    except ImportError:  # renamed from InvalidHash in argon2-cffi 23.1
+        from argon2.exceptions import InvalidHash as InvalidHashError
+except ImportError:
+    PasswordHasher = None
+
 # -------------------------
 # Config & filenames
 # -------------------------
@@ -17,6 +37,7 @@ ISSUED_FILE = "issued_books.json"
 
 FINE_PER_DAY = 10
 DEFAULT_LOAN_DAYS = 14
+BOOKS_PER_PAGE = 20
 APP_TITLE = "📚 Library Management System"
 
 # -------------------------
@@ -39,35 +60,139 @@ def backup_corrupt_file(path: str):
     try:
         ts = int(time.time())
         bak = f"{path}.corrupt.{ts}"
-        shutil.copy(path, bak)
+        # rename instead of copying: the caller rewrites `path` with the
+        # default right after, so there is no reason to stream the bytes
+        os.replace(path, bak)
     except Exception:
         pass
 
+# In-process cache of parsed JSON, keyed on file mtime. Streamlit
+# re-executes this whole script per interaction, so plain module globals
+# are rebuilt every rerun; st.cache_resource keeps the cache dicts alive
+# for the life of the server process. Only the container comes from
+# cache_resource — entries are still validated against file stamps, so
+# cross-session staleness can't occur.
+@st.cache_resource(show_spinner=False)
+def _process_caches():
+    json_cache: Dict[str, Any] = {}
+    last_written: Dict[str, int] = {}
+    corpus_cache = {"stamp": None, "rows": [], "blob": "", "offsets": []}
+    issued_index = {"stamp": None, "by_user": {}}
+    books_index = {"stamp": None, "by_id": {}}
+    users_index = {"stamp": None, "by_email": {}}
+    save_lock = threading.Lock()
+    return json_cache, last_written, corpus_cache, issued_index, books_index, users_index, save_lock
+
+_json_cache, _last_written, _corpus_cache, _issued_index, _books_index, _users_index, _save_lock = _process_caches()
+
+def _cache_stamp(path: str):
+    # Stamp of the currently-cached parse of `path` — derived-index caches
+    # key on this, so in-place mutation followed by save invalidates them.
+    cached = _json_cache.get(path)
+    return cached[0] if cached is not None else None
+
+def _file_stamp(path: str):
+    # Nanosecond mtime + size: plain getmtime() has whole-second
+    # granularity on some filesystems, which made back-to-back rewrites
+    # (issue then return within the same second) serve stale cache hits.
+    stt = os.stat(path)
+    return (stt.st_mtime_ns, stt.st_size)
+
+# Files rewritten on every issue/return; stored compact (no indent) so
+# each rewrite serializes and flushes the fewest bytes.
+COMPACT_FILES = {ISSUED_FILE}
+
+def _dump_json(path: str, data: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data, option=0 if path in COMPACT_FILES else orjson.OPT_INDENT_2)
+    if path in COMPACT_FILES:
+        return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+
 def save_json(path: str, data: Any):
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    # Streamlit serves each session on its own thread; serialize writers
+    # so two sessions can't race on the same temp file or interleave the
+    # read-modify-write of a mutation.
+    with _save_lock:
+        _save_json_locked(path, data)
+
+def _save_json_locked(path: str, data: Any):
+    payload = _dump_json(path, data)
+    digest = hash(payload)
+    if _last_written.get(path) == digest:
+        cached = _json_cache.get(path)
+        try:
+            if cached is not None and cached[0] == _file_stamp(path):
+                _json_cache[path] = (cached[0], data)
+                return
+        except OSError:
+            pass
+    # Write to a sibling temp file and atomically swap it in, so a crash
+    # mid-write can never leave a truncated file for the corrupt-recovery
+    # path to throw away.
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    # fsync the directory too, so the rename itself survives a power cut
+    try:
+        dirfd = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+        try:
+            os.fsync(dirfd)
+        finally:
+            os.close(dirfd)
+    except OSError:
+        pass
+    _last_written[path] = digest
+    try:
+        _json_cache[path] = (_file_stamp(path), data)
+    except OSError:
+        _json_cache.pop(path, None)
 
 def load_json(path: str, default):
-    if not os.path.exists(path):
+    try:
+        stamp = _file_stamp(path)
+    except OSError:
         save_json(path, default)
         return default
+    cached = _json_cache.get(path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    # Read the file in one pass and parse from memory — avoids json.load's
+    # chunked re-reads. Bytes are handed to the parser directly (both
+    # orjson and stdlib json accept them), skipping a UTF-8 decode pass.
     try:
-        if os.path.getsize(path) == 0:
-            save_json(path, default)
-            return default
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except json.JSONDecodeError:
-        backup_corrupt_file(path)
+        with open(path, "rb") as f:
+            raw = f.read()
+    except Exception:
+        return default
+    if not raw or raw.isspace():  # isspace avoids strip()'s full copy
         save_json(path, default)
         return default
-    except Exception:
+    try:
+        data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+    except ValueError:  # covers both json and orjson decode errors
+        backup_corrupt_file(path)
+        save_json(path, default)
         return default
+    _json_cache[path] = (stamp, data)
+    return data
 
 # -------------------------
 # Bootstrapping initial data
 # -------------------------
 def bootstrap_files():
+    # Fast path: on an established install every rerun used to rebuild the
+    # sample fixtures and pay three load_json round-trips; now it's three
+    # existence checks and a once-per-process normalization pass.
+    if os.path.exists(BOOKS_FILE) and os.path.exists(USERS_FILE) and os.path.exists(ISSUED_FILE):
+        if not _users_index.get("normalized"):
+            _normalize_emails()
+            _reset_legacy_availability()
+            _users_index["normalized"] = True
+        return
     sample_books = [
         {
             "id": 1,
@@ -111,7 +236,7 @@ def bootstrap_files():
             "name": "Head Librarian",
             "email": "librarian@example.com",
             "mobile": "9999999999",
-            "password_hash": hashlib.sha256("admin123".encode()).hexdigest(),
+            "password_hash": hash_password("admin123"),
             "role": "librarian",
             "favorites": []
         },
@@ -119,7 +244,7 @@ def bootstrap_files():
             "name": "Demo User",
             "email": "user@example.com",
             "mobile": "8888888888",
-            "password_hash": hashlib.sha256("user123".encode()).hexdigest(),
+            "password_hash": hash_password("user123"),
             "role": "user",
             "favorites": []
         }
@@ -128,34 +253,230 @@ def bootstrap_files():
     load_json(BOOKS_FILE, sample_books)
     load_json(USERS_FILE, sample_users)
     load_json(ISSUED_FILE, sample_issued)
+    _normalize_emails()
+    _reset_legacy_availability()
+    _users_index["normalized"] = True
+
+def _normalize_emails():
+    # Emails are the join key everywhere; lowercase them once at startup
+    # so lookups and joins can compare stored values directly instead of
+    # calling .lower() in every hot loop. Writes below are no-ops unless
+    # legacy mixed-case data was found.
+    users = get_users()
+    if any(u.get('email', '') != u.get('email', '').lower() for u in users):
+        for u in users:
+            u['email'] = u.get('email', '').lower()
+        save_users(users)
+    issued = get_issued()
+    if any(r.get('user_email', '') != r.get('user_email', '').lower() for r in issued):
+        for r in issued:
+            r['user_email'] = r.get('user_email', '').lower()
+        save_issued(issued)
+
+def _reset_legacy_availability():
+    # Before circulation state became ledger-derived, issuing a book wrote
+    # available=False (and issued_to) into books_data.json; return no
+    # longer clears it, which would leave such books stuck unavailable.
+    # Under the old code the flag always coincided with an open ledger
+    # record, so resetting it (and dropping issued_to) is safe — the
+    # ledger alone decides availability now. No-op write unless legacy
+    # state was found.
+    books = get_books()
+    stale = [b for b in books if not b.get('available', True) or 'issued_to' in b]
+    if stale:
+        for b in stale:
+            b['available'] = True
+            b.pop('issued_to', None)
+        save_books(books)
 
 # -------------------------
 # Data helpers
 # -------------------------
+# All three getters serve from the stamp-validated in-process cache in
+# load_json — repeated calls within (and across) reruns cost one os.stat,
+# not a read+parse. Contract: callers may mutate the returned list in
+# place but must then call the matching save_* so cache and disk agree.
 def get_books() -> List[Dict[str,Any]]:
     return load_json(BOOKS_FILE, [])
 
 def save_books(data: List[Dict[str,Any]]):
     save_json(BOOKS_FILE, data)
 
+def books_by_id(books: List[Dict[str,Any]] = None) -> Dict[int,Dict[str,Any]]:
+    # Built once per catalog version; every id lookup shares it.
+    if books is None:
+        books = get_books()
+    stamp = _cache_stamp(BOOKS_FILE)
+    if stamp is not None and _books_index["stamp"] == stamp:
+        return _books_index["by_id"]
+    idx = {b['id']: b for b in books}
+    if stamp is not None:
+        _books_index.update(stamp=stamp, by_id=idx)
+    return idx
+
+def book_genre_sets() -> Dict[int,set]:
+    # id -> set of genres, rebuilt only when the catalog version changes.
+    stamp = _cache_stamp(BOOKS_FILE)
+    if stamp is not None and _books_index.get("genre_stamp") == stamp:
+        return _books_index["genre_sets"]
+    gsets = {}
+    for b in get_books():
+        g = b.get('genre', [])
+        gsets[b['id']] = set([g] if isinstance(g, str) else g)
+    if stamp is not None:
+        _books_index.update(genre_stamp=stamp, genre_sets=gsets)
+    return gsets
+
+def genre_postings() -> Dict[str, set]:
+    # genre -> book ids, per catalog version; lets the recommender turn
+    # "which books share a seed genre" into a few set unions.
+    stamp = _cache_stamp(BOOKS_FILE)
+    if stamp is not None and _books_index.get("postings_stamp") == stamp:
+        return _books_index["postings"]
+    postings: Dict[str, set] = {}
+    for bid, gset in book_genre_sets().items():
+        for g in gset:
+            postings.setdefault(g, set()).add(bid)
+    if stamp is not None:
+        _books_index.update(postings_stamp=stamp, postings=postings)
+    return postings
+
+def scoring_rows() -> List[tuple]:
+    # Struct-of-arrays layout for the recommender: (book, genre_set,
+    # availability bonus) triples laid out once per catalog version, so
+    # the scoring loop touches ready-made values instead of doing dict
+    # lookups per book per call.
+    stamp = (_cache_stamp(BOOKS_FILE), _cache_stamp(ISSUED_FILE))
+    if None not in stamp and _books_index.get("score_stamp") == stamp:
+        return _books_index["score_rows"]
+    gsets = book_genre_sets()
+    rows = [(b, gsets[b['id']], 1 if book_available(b) else 0) for b in get_books()]
+    if None not in stamp:
+        _books_index.update(score_stamp=stamp, score_rows=rows)
+    return rows
+
+# Lowercased searchable text per book, rebuilt only when the books list
+# itself is reloaded (i.e. after a mutation), not on every keystroke.
+# The per-book texts are also packed into one separator-joined blob so a
+# query is a single C-level scan over contiguous memory rather than N
+# small substring tests.
+
+def search_corpus(books: List[Dict[str,Any]]) -> List[tuple]:
+    stamp = _cache_stamp(BOOKS_FILE)
+    if stamp is not None and _corpus_cache["stamp"] == stamp:
+        return _corpus_cache["rows"]
+    rows = []
+    for b in books:
+        g = b.get('genre', [])
+        if isinstance(g, str):
+            g = [g]
+        text = "\n".join([b.get('title',''), b.get('author','')] + g).lower()
+        rows.append((b, text))
+    blob_parts, offsets, pos = [], [], 0
+    for _, text in rows:
+        offsets.append(pos)
+        blob_parts.append(text)
+        pos += len(text) + 1
+    _corpus_cache.update(stamp=stamp, rows=rows, blob="\x1e".join(blob_parts), offsets=offsets)
+    return rows
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+def keyword_index() -> Dict[str, set]:
+    # token -> book ids over title/genre/description/keywords, rebuilt per
+    # catalog version; powers the chatbot's keyword recommendations.
+    stamp = _cache_stamp(BOOKS_FILE)
+    if stamp is not None and _corpus_cache.get("kw_stamp") == stamp:
+        return _corpus_cache["kw_index"]
+    index: Dict[str, set] = {}
+    for b in get_books():
+        g = b.get('genre', [])
+        if isinstance(g, str):
+            g = [g]
+        text = " ".join([b.get('title',''), b.get('description','')] + g + list(b.get('keywords', []))).lower()
+        for tok in _TOKEN_RE.findall(text):
+            index.setdefault(tok, set()).add(b['id'])
+    if stamp is not None:
+        _corpus_cache.update(kw_stamp=stamp, kw_index=index)
+    return index
+
+def search_books(books: List[Dict[str,Any]], query: str) -> List[Dict[str,Any]]:
+    ql = query.lower()
+    search_corpus(books)  # ensure blob/offsets are current
+    blob, offsets = _corpus_cache["blob"], _corpus_cache["offsets"]
+    hits, seen, pos = [], set(), blob.find(ql)
+    while pos != -1:
+        i = bisect.bisect_right(offsets, pos) - 1
+        if i not in seen:
+            seen.add(i)
+            hits.append(books[i])
+        pos = blob.find(ql, pos + 1)
+    return hits
+
 def get_users() -> List[Dict[str,Any]]:
     return load_json(USERS_FILE, [])
 
 def save_users(data: List[Dict[str,Any]]):
     save_json(USERS_FILE, data)
 
+def users_by_email(users: List[Dict[str,Any]] = None) -> Dict[str,Dict[str,Any]]:
+    # emails are stored lowercased; index rebuilt once per users.json version
+    if users is None:
+        users = get_users()
+    stamp = _cache_stamp(USERS_FILE)
+    if stamp is not None and _users_index["stamp"] == stamp:
+        return _users_index["by_email"]
+    idx = {u['email']: u for u in users}
+    if stamp is not None:
+        _users_index.update(stamp=stamp, by_email=idx)
+    return idx
+
 def get_issued() -> List[Dict[str,Any]]:
     return load_json(ISSUED_FILE, [])
 
 def save_issued(data: List[Dict[str,Any]]):
     save_json(ISSUED_FILE, data)
 
+
 # -------------------------
 # Auth
 # -------------------------
+# Login retries and the signup/login round-trip hash the same string
+# repeatedly; memoize so each password is digested once per process.
+# (Argon2 verification is deliberately NOT memoized: caching verdicts
+# keyed on plaintext would defeat the point of a slow, salted hash.)
+# hashlib already routes through OpenSSL's EVP layer, which dispatches to
+# SHA-NI/ARMv8 crypto extensions when the CPU has them — no Python-level
+# work needed for hardware acceleration.
+@functools.lru_cache(maxsize=128)
 def hash_password(password: str) -> str:
     return hashlib.sha256(password.encode()).hexdigest()
 
+# Argon2id for new hashes when argon2-cffi is installed; unsalted SHA-256
+# stays as the fallback and for verifying pre-existing accounts, which
+# are upgraded in place on their next successful login.
+@st.cache_resource(show_spinner=False)
+def _get_password_hasher():
+    return PasswordHasher() if PasswordHasher is not None else None
+
+_argon2_hasher = _get_password_hasher()
+
+def make_password_hash(password: str) -> str:
+    if _argon2_hasher is not None:
+        return _argon2_hasher.hash(password)
+    return hash_password(password)
+
+def verify_password(password: str, stored_hash: str) -> bool:
+    if stored_hash.startswith("$argon2"):
+        if _argon2_hasher is None:
+            return False
+        try:
+            return _argon2_hasher.verify(stored_hash, password)
+        except (VerificationError, InvalidHashError):
+            return False
+    # constant-time compare for the legacy SHA-256 path
+    return hmac.compare_digest(stored_hash, hash_password(password))
+
 def signup_user(name: str, mobile: str, email: str, password: str, role: str) -> (bool,str):
     users = get_users()
     email_l = email.strip().lower()
@@ -163,13 +484,15 @@ def signup_user(name: str, mobile: str, email: str, password: str, role: str) ->
     if not ok:
         return False, msg
 
-    if any(u['email'].lower() == email_l for u in users):
+    # Early-exit scan over normalized emails: cheaper than materializing
+    # the full email->user dict for a one-off membership test.
+    if any(u['email'] == email_l for u in users):
         return False, "Email already registered."
     users.append({
         "name": name.strip(),
         "mobile": mobile.strip(),
         "email": email_l,
-        "password_hash": hash_password(password),
+        "password_hash": make_password_hash(password),
         "role": role,
         "favorites": []
     })
@@ -177,111 +500,196 @@ def signup_user(name: str, mobile: str, email: str, password: str, role: str) ->
     return True, "Account created."
 
 def login_user(email: str, password: str):
-    users = get_users()
     email_l = email.strip().lower()
-    phash = hash_password(password)
-    for u in users:
-        if u['email'].lower() == email_l and u['password_hash'] == phash:
-            return {k: v for k,v in u.items() if k != 'password_hash'}
+    u = users_by_email().get(email_l)
+    if u and verify_password(password, u['password_hash']):
+        # transparently migrate legacy SHA-256 hashes to Argon2id
+        if _argon2_hasher is not None and not u['password_hash'].startswith("$argon2"):
+            u['password_hash'] = make_password_hash(password)
+            save_users(get_users())
+        return {k: v for k,v in u.items() if k != 'password_hash'}
     return None
 
 # -------------------------
 # Issue / Return
 # -------------------------
+def make_issue_record(email_l: str, book_id: int, today: date, due: date) -> Dict[str,Any]:
+    # One constructor for ledger records. Dict pooling proper would buy
+    # nothing here — CPython free-lists small dicts already, and a
+    # mutation's cost is dominated by serializing the ledger, which the
+    # compact/skip-unchanged write paths address.
+    return {
+        "user_email": email_l,
+        "book_id": book_id,
+        "issue_date": str(today),
+        "due_date": str(due),
+        "returned": False,
+        "return_date": None
+    }
+
 def issue_book_to_user(user_email: str, book_id: int, loan_days: int = DEFAULT_LOAN_DAYS) -> (bool,str):
     books = get_books()
     issued = get_issued()
-    book = next((b for b in books if b['id'] == book_id), None)
+    book = books_by_id(books).get(book_id)
     if not book:
         return False, "Book not found."
-    if not book.get('available', True):
+    if not book_available(book):
         return False, "Book currently not available."
 
-    # set availability + who holds it (optional)
-    for b in books:
-        if b['id'] == book_id:
-            b['available'] = False
-            b['issued_to'] = user_email.lower()
-    save_books(books)
-
     today = date.today()
     due = today + timedelta(days=loan_days)
-    issued.append({
-        "user_email": user_email.lower(),
-        "book_id": book_id,
-        "issue_date": str(today),
-        "due_date": str(due),
-        "returned": False,
-        "return_date": None
-    })
+    issued.append(make_issue_record(user_email.lower(), book_id, today, due))
     save_issued(issued)
     return True, f"Issued '{book['title']}'. Due on {due.isoformat()}."
 
 
 def return_book_from_user(user_email: str, book_id: int) -> (bool,str,int):
-    books = get_books()
     issued = get_issued()
-    rec = next((r for r in issued if r['user_email'].lower() == user_email.lower() and r['book_id'] == book_id and not r['returned']), None)
+    # Probe the per-user index (same dict objects as `issued`) instead of
+    # scanning the full ledger.
+    rec = next((r for r in user_active_issues(user_email) if r['book_id'] == book_id), None)
     if not rec:
         return False, "No active issue found for this user & book.", 0
     today = date.today()
-    due = datetime.fromisoformat(rec['due_date']).date()
+    due = record_due_date(rec)
     fine = (today - due).days * FINE_PER_DAY if today > due else 0
     rec['returned'] = True
     rec['return_date'] = str(today)
     save_issued(issued)
-    for b in books:
-        if b['id'] == book_id:
-            b['available'] = True
-            b.pop('issued_to', None)
-    save_books(books)
     return True, "Book returned.", max(0, fine)
 
-def user_active_issues(user_email: str) -> List[Dict[str,Any]]:
-    return [r for r in get_issued() if r['user_email'].lower() == user_email.lower() and not r.get('returned', False)]
+def active_issues_by_user() -> Dict[str,List[Dict[str,Any]]]:
+    # Group active records per user once per ledger version; the sidebar,
+    # Dashboard, Issued Books and recommender all consume this instead of
+    # re-filtering the full list.
+    issued = get_issued()
+    stamp = _cache_stamp(ISSUED_FILE)
+    if stamp is None or _issued_index["stamp"] != stamp:
+        by_user: Dict[str,List[Dict[str,Any]]] = {}
+        for r in issued:
+            if not r.get('returned', False):
+                by_user.setdefault(r['user_email'], []).append(r)
+        _issued_index.update(stamp=stamp, by_user=by_user)
+    return _issued_index["by_user"]
 
-def calculate_fine_for_record(rec: Dict[str,Any]) -> int:
-    due = datetime.fromisoformat(rec['due_date']).date()
-    today = date.today()
+def user_active_issues(user_email: str) -> List[Dict[str,Any]]:
+    # Expects the caller's normalized (stored) email; every call site
+    # passes session/stored values, so no defensive .lower() here.
+    return active_issues_by_user().get(user_email, [])
+
+def unavailable_book_ids() -> set:
+    # Availability is derived from the ledger (ids with an open issue),
+    # cached per ledger version. Issue/return therefore no longer rewrite
+    # the whole catalog file just to flip a per-book flag.
+    issued = get_issued()
+    stamp = _cache_stamp(ISSUED_FILE)
+    if stamp is None or _issued_index.get("unavail_stamp") != stamp:
+        out = {r['book_id'] for r in issued if not r.get('returned', False)}
+        _issued_index.update(unavail_stamp=stamp, unavailable=out)
+    return _issued_index["unavailable"]
+
+def book_available(book: Dict[str,Any]) -> bool:
+    # Circulation state comes from the ledger; legacy available=False
+    # flags are reset once at startup by _reset_legacy_availability.
+    return book.get('available', True) and book['id'] not in unavailable_book_ids()
+
+@functools.lru_cache(maxsize=4096)
+def _parse_iso_date(s: str) -> date:
+    # date.fromisoformat skips building a datetime just to throw away the
+    # time component
+    return date.fromisoformat(s)
+
+def record_due_date(rec: Dict[str,Any]) -> date:
+    # Single home for due-date parsing. Due-date strings repeat across
+    # reruns for as long as a loan is open, so each distinct string is
+    # parsed once per process rather than once per render. Parsed values
+    # stay out of the record dicts themselves — they must remain
+    # JSON-serializable for save_issued.
+    return _parse_iso_date(rec['due_date'])
+
+def fines_for_records(recs: List[Dict[str,Any]], today: date = None) -> List[int]:
+    # Batch fine computation: one date.today(), ordinal arithmetic per
+    # record — the pure-Python shape of the "vectorize the fines" idea
+    # (NumPy would spend more time boxing these few ints than computing).
+    if today is None:
+        today = date.today()
+    t_ord = today.toordinal()
+    return [max(0, (t_ord - _parse_iso_date(r['due_date']).toordinal()) * FINE_PER_DAY) for r in recs]
+
+def calculate_fine_for_record(rec: Dict[str,Any], today: date = None) -> int:
+    # Callers iterating many records pass today once instead of paying a
+    # date.today() syscall per record.
+    due = record_due_date(rec)
+    if today is None:
+        today = date.today()
     return max(0, (today - due).days * FINE_PER_DAY) if today > due else 0
 
 # -------------------------
 # Recommendations & Chatbot
 # -------------------------
 def recommend_for_user(user_email: str, top_k: int = 6) -> List[Dict[str,Any]]:
-    books = get_books()
-    users = get_users()
-    user = next((u for u in users if u['email'].lower() == user_email.lower()), {})
-    fav_ids = user.get('favorites', [])
-    issued = user_active_issues(user_email)
+    user = users_by_email().get(user_email.lower(), {})
+    fav_ids = set(user.get('favorites', []))
+    seed_ids = fav_ids | {r['book_id'] for r in user_active_issues(user_email)}
+    # Seed genres are unioned from favorites + active issues, then the
+    # genre->ids postings resolve the whole "+2" cohort with a few set
+    # unions instead of a per-book genre test.
+    book_genres = book_genre_sets()
     genres = set()
-    for b in books:
-        if b['id'] in fav_ids or any(r['book_id']==b['id'] for r in issued):
-            genres.update(b.get('genre',[]))
-    def score(b):
-        s = 0
-        if any(g in b.get('genre',[]) for g in genres):
-            s += 2
-        if b.get('available', False):
-            s += 1
-        return s
-    ranked = sorted(books, key=score, reverse=True)
-    return ranked[:top_k]
+    for bid in seed_ids:
+        genres |= book_genres.get(bid, set())
+    postings = genre_postings()
+    matched_ids = set()
+    for g in genres:
+        matched_ids |= postings.get(g, set())
+    rows = scoring_rows()
+    if not matched_ids:
+        # brand-new user (no favorites/issues): ranking reduces to
+        # availability, so skip the membership probe per book entirely
+        return [row[0] for row in heapq.nlargest(top_k, rows, key=lambda row: row[2])]
+    def score(row):
+        return (2 if row[0]['id'] in matched_ids else 0) + row[2]
+    # Partial selection: only top_k results are shown, so keep a k-sized
+    # heap instead of fully sorting the catalog.
+    return [row[0] for row in heapq.nlargest(top_k, rows, key=score)]
+# All intent keywords in one alternation with named groups: the message
+# is scanned once and every intent present is collected, then dispatched
+# in the same priority order as the old chained `in` tests.
+_INTENT_RE = re.compile(
+    r"(?P<recommend>recommend|suggest)"
+    r"|(?P<issue_help>how to issue|issue a book)"
+    r"|(?P<return_help>how to return|return a book)"
+    r"|(?P<genres>genres|categories)"
+    r"|(?P<greeting>hi|hello|hey)"
+)
+
 def chatbot_response_for_user(user_email: str, message: str) -> str:
     m = message.strip().lower()
     if not m:
         return "Ask me for book recommendations, or how to issue/return books."
 
+    intents = {hit.lastgroup for hit in _INTENT_RE.finditer(m)}
+
     # Book recommendation by user interest keywords
-    if "recommend" in m or "suggest" in m:
+    if "recommend" in intents:
         keywords = m.replace("recommend","").replace("suggest","").strip().split()
-        books = get_books()
-        # filter books by keywords in title, genre, or description
-        recs = []
-        for b in books:
-            text = (b.get('title','') + ' ' + ' '.join(b.get('genre',[])) + ' ' + b.get('description','')).lower()
-            if any(k in text for k in keywords) and b.get('available', False):
-                recs.append(b)
+        # Probe the prebuilt inverted index first — O(1) per keyword.
+        bidx = books_by_id()
+        kidx = keyword_index()
+        hit_ids = set()
+        for k in keywords:
+            hit_ids |= kidx.get(k, set())
+        recs = [bidx[i] for i in sorted(hit_ids) if book_available(bidx[i])]
+        if not recs and keywords:
+            # fall back to the substring alternation for partial-word
+            # queries the token index can't see (e.g. "prog")
+            kw_re = re.compile("|".join(map(re.escape, keywords)))
+            for b in get_books():
+                if not book_available(b):
+                    continue
+                text = (b.get('title','') + ' ' + ' '.join(b.get('genre',[])) + ' ' + b.get('description','')).lower()
+                if kw_re.search(text):
+                    recs.append(b)
         # fallback to previous issued or favorites
         if not recs:
             recs = recommend_for_user(user_email, top_k=3)
@@ -289,17 +697,18 @@ def chatbot_response_for_user(user_email: str, message: str) -> str:
             return "No recommendations found right now. Try another keyword."
         return "I suggest:\n" + "\n".join([f"- {r['title']} by {r['author']}" for r in recs])
 
-    if "how to issue" in m or "issue a book" in m:
+    if "issue_help" in intents:
         return "Go to 'All Books', then click the Issue button (only available for Users)."
 
-    if "how to return" in m or "return a book" in m:
+    if "return_help" in intents:
         return "Go to 'Issued Books' and click Return next to the book you want to return."
 
-    if "genres" in m or "categories" in m:
-        genres = sorted({g for b in get_books() for g in b.get('genre',[])} )
+    if "genres" in intents:
+        # the genre->ids postings already hold the distinct genres
+        genres = sorted(genre_postings())
         return "Available genres: " + ", ".join(genres) if genres else "No genre data available."
 
-    if any(x in m for x in ["hi","hello","hey"]):
+    if "greeting" in intents:
         return "Hello! I'm the Chatbot. Try: 'Recommend Python books', 'How to issue a book', or 'What genres are available?'."
 
     return "Sorry — I didn't understand. Try: 'Recommend Python books', 'How to issue a book', or 'What genres are available?'."
@@ -308,38 +717,83 @@ def chatbot_response_for_user(user_email: str, message: str) -> str:
 # -------------------------
 # UI helpers
 # -------------------------
-def book_card_ui(book: Dict[str, Any], current_user_email: str):
+@st.cache_data(show_spinner=False, max_entries=256, persist="disk")
+def fetch_cover(url: str):
+    # Cover bytes are cached across reruns (and sessions) so each unique
+    # URL is fetched once instead of once per card per render.
+    try:
+        with urllib.request.urlopen(url, timeout=5) as resp:
+            return resp.read()
+    except Exception:
+        return None
+
+def show_cover(url: str, width: int):
+    img = fetch_cover(url) if url else None
+    if img is not None:
+        st.image(img, width=width)
+    else:
+        st.write("[No Image]")
+
+def card_static_md() -> Dict[int, str]:
+    # Partial evaluation of the card template: everything that doesn't
+    # change between reruns (title/genre/description) is formatted once
+    # per catalog version; only the availability line is live.
+    stamp = _cache_stamp(BOOKS_FILE)
+    if stamp is not None and _books_index.get("card_stamp") == stamp:
+        return _books_index["card_md"]
+    out = {}
+    for b in get_books():
+        genres = b.get('genre', [])
+        if isinstance(genres, str):
+            genres = [genres]
+        desc = b.get('description', '')
+        out[b['id']] = (
+            f"### {b['title']}\n\n"
+            f"*Genre:* {', '.join(genres)}\n\n"
+            f"{desc[:400] + ('…' if len(desc) > 400 else '')}\n\n"
+        )
+    if stamp is not None:
+        _books_index.update(card_stamp=stamp, card_md=out)
+    return out
+
+def _fragment(fn):
+    # st.fragment (1.37+) scopes a widget interaction's rerun to the one
+    # card it happened in instead of replaying the whole page; fall back
+    # to a plain function on older Streamlit.
+    frag = getattr(st, "fragment", None)
+    return frag(fn) if frag is not None else fn
+
+@_fragment
+def book_card_ui(book: Dict[str, Any], current_user_email: str, role: str = "user", active_ids: set = None):
+    is_available = book_available(book)
     cols = st.columns([1, 3])
 
     # LEFT: cover
     with cols[0]:
-        if book.get('cover_url'):
-            try:
-                st.image(book['cover_url'], width=110)
-            except Exception:
-                st.write("[No Image]")
+        show_cover(book.get('cover_url'), width=110)
 
     # RIGHT: details + actions
     with cols[1]:
-        st.markdown(f"### {book['title']}")
-        genres = book.get('genre', [])
-        if isinstance(genres, str):
-            genres = [genres]
-        st.markdown(f"*Genre:* {', '.join(genres)}")
-        desc = book.get('description', '')
-        st.write(desc[:400] + ("…" if len(desc) > 400 else ""))
-        st.write(f"*Available:* {'✅ Yes' if book.get('available', True) else '❌ No'}")
+        # One markdown delta per card: pre-rendered static block plus the
+        # live availability line.
+        st.markdown(
+            card_static_md().get(book['id'], f"### {book['title']}\n\n")
+            + f"*Available:* {'✅ Yes' if is_available else '❌ No'}"
+        )
 
         c1, c2, c3 = st.columns([1, 1, 1])
 
+        # Librarians only browse — skip the issue/favorite widgets entirely
+        # so large catalogs don't pay for buttons nobody can click.
+        if role != "user":
+            with c3:
+                book_overview_expander(book)
+            return
+
         # --- check if this user already issued this book ---
-        issued_records = get_issued()
-        active_for_user = any(
-            r for r in issued_records
-            if r['book_id'] == book['id']
-            and r['user_email'].lower() == current_user_email.lower()
-            and not r.get('returned', False)
-        )
+        if active_ids is None:
+            active_ids = {r['book_id'] for r in user_active_issues(current_user_email)}
+        active_for_user = book['id'] in active_ids
 
         # ---------- Issue flow ----------
         with c1:
@@ -351,20 +805,23 @@ def book_card_ui(book: Dict[str, Any], current_user_email: str):
             if active_for_user:
                 st.success("✅ Already issued by you")
 
-            elif book.get("available", True):
+            elif is_available:
                 # Step 1: show Issue button
                 if st.button("📥 Issue", key=issue_key):
                     st.session_state[confirm_flag] = True
 
-                # Step 2: show confirmation (Yes/No + Confirm)
+                # Step 2: confirmation inside a form, so picking Yes/No and
+                # confirming is a single rerun instead of one per widget.
                 if st.session_state.get(confirm_flag, False):
-                    st.write(f"Are you sure you want to issue '{book['title']}'?")
-                    choice = st.radio("Choose an option:", ["No", "Yes"], key=radio_key)
-                    if st.button("Confirm", key=confirm_btn_key):
+                    with st.form(key=confirm_btn_key):
+                        st.write(f"Are you sure you want to issue '{book['title']}'?")
+                        choice = st.radio("Choose an option:", ["No", "Yes"], key=radio_key)
+                        submitted = st.form_submit_button("Confirm")
+                    if submitted:
                         if choice == "Yes":
                             ok, msg = issue_book_to_user(current_user_email, book['id'])
                             if ok:
-                                st.success(msg)
+                                flash(msg)
                                 st.session_state[confirm_flag] = False
                                 st.rerun()
                             else:
@@ -379,45 +836,59 @@ def book_card_ui(book: Dict[str, Any], current_user_email: str):
         # ---------- Favorites ----------
         with c2:
             if st.button("⭐ Add to Favorites", key=f"fav_{book['id']}_{current_user_email}"):
+                # Single read + indexed lookup; write only when something changed.
                 users = get_users()
-                for u in users:
-                    if u['email'].lower() == current_user_email.lower():
-                        u.setdefault('favorites', [])
-                        if book['id'] not in u['favorites']:
-                            u['favorites'].append(book['id'])
-                            save_users(users)
-                            st.session_state['user'] = {
-                                k: v for k, v in u.items() if k != 'password_hash'
-                            }
-                            st.success("Added to favorites.")
-                        else:
-                            st.info("Already in favorites.")
-                st.rerun()
+                u = users_by_email(users).get(current_user_email)
+                if u is not None:
+                    u.setdefault('favorites', [])
+                    if book['id'] not in u['favorites']:
+                        u['favorites'].append(book['id'])
+                        save_users(users)
+                        st.session_state['user'] = {
+                            k: v for k, v in u.items() if k != 'password_hash'
+                        }
+                        st.success("Added to favorites.")
+                    else:
+                        st.info("Already in favorites.")
+                # No st.rerun() here: session state is already synced, the
+                # card itself doesn't render favorite status, and the extra
+                # rerun only wiped the success message and re-rendered the
+                # whole page a second time.
 
         # ---------- Overview ----------
         with c3:
-            with st.expander("🔎 Overview"):
-                if book.get('cover_url'):
-                    st.image(book['cover_url'], width=150)
-                st.markdown(f"*Title:* {book.get('title','')}")
-                st.markdown(f"*Author:* {book.get('author','')}")
-                genres2 = book.get('genre', [])
-                if isinstance(genres2, str):
-                    genres2 = [genres2]
-                st.markdown(f"*Genre:* {', '.join(genres2)}")
-                st.markdown("*Description:*")
-                st.write(book.get('description',''))
-                if book.get('index'):
-                    st.markdown("*Index:*")
-                    for idx in book.get('index', []):
-                        st.write(f"- {idx}")
+            book_overview_expander(book)
+
+def book_overview_expander(book: Dict[str, Any]):
+    with st.expander("🔎 Overview"):
+        if book.get('cover_url'):
+            show_cover(book['cover_url'], width=150)
+        st.markdown(f"*Title:* {book.get('title','')}")
+        st.markdown(f"*Author:* {book.get('author','')}")
+        genres2 = book.get('genre', [])
+        if isinstance(genres2, str):
+            genres2 = [genres2]
+        st.markdown(f"*Genre:* {', '.join(genres2)}")
+        st.markdown("*Description:*")
+        st.write(book.get('description',''))
+        if book.get('index'):
+            st.markdown("*Index:*")
+            for idx in book.get('index', []):
+                st.write(f"- {idx}")
 
 # -------------------------
 # Main app
 # -------------------------
+def flash(msg: str):
+    # Queue feedback to survive the single st.rerun after a mutation —
+    # without this, success messages were drawn and immediately wiped.
+    st.session_state['flash'] = msg
+
 def app():
     st.set_page_config(page_title=APP_TITLE, layout="wide")
     st.title(APP_TITLE)
+    if st.session_state.get('flash'):
+        st.success(st.session_state.pop('flash'))
     bootstrap_files()
     if 'user' not in st.session_state:
         st.session_state['user'] = None
@@ -457,24 +928,38 @@ def app():
         st.stop()
 
     current_user = st.session_state['user']
+    # Hoisted once per script run; these are referenced in every render loop.
+    current_email = current_user['email']
+    current_role = current_user['role']
 
     st.sidebar.markdown(f"### 👤 {current_user['name']}")
-    st.sidebar.markdown(f"*Role:* {current_user['role'].capitalize()}")
+    st.sidebar.markdown(f"*Role:* {current_role.capitalize()}")
     st.sidebar.markdown("---")
 
     # Notifications
-    notes = []
-    user_issued = user_active_issues(current_user['email'])
-    for rec in user_issued:
-        due = datetime.fromisoformat(rec['due_date']).date()
-        days_left = (due - date.today()).days
-        book = next((b for b in get_books() if b['id']==rec['book_id']), None)
-        title = book['title'] if book else f"Book #{rec['book_id']}"
-        if days_left <= 3 and days_left > 0:
-            notes.append(f"⏳ {days_left} days left: {title} (due {rec['due_date']})")
-        if days_left < 0:
-            fine_now = calculate_fine_for_record(rec)
-            notes.append(f"⚠ Overdue: {title} — fine ₹{fine_now}")
+    user_issued = user_active_issues(current_email)
+    today = date.today()
+    # Notifications are recomputed only when the ledger/catalog version or
+    # the calendar day changes, not on every rerun.
+    notes_key = (current_email, _cache_stamp(ISSUED_FILE), _cache_stamp(BOOKS_FILE), today.toordinal())
+    cached_notes = st.session_state.get('notes_cache')
+    if cached_notes is not None and cached_notes[0] == notes_key:
+        notes = cached_notes[1]
+    else:
+        notes = []
+        # Index once, and only when there is anything to join against it.
+        bidx = books_by_id() if user_issued else {}
+        for rec in user_issued:
+            due = record_due_date(rec)
+            days_left = (due - today).days
+            book = bidx.get(rec['book_id'])
+            title = book['title'] if book else f"Book #{rec['book_id']}"
+            if days_left <= 3 and days_left > 0:
+                notes.append(f"⏳ {days_left} days left: {title} (due {rec['due_date']})")
+            if days_left < 0:
+                # due is already parsed; -days_left is exactly the overdue days
+                notes.append(f"⚠ Overdue: {title} — fine ₹{-days_left * FINE_PER_DAY}")
+        st.session_state['notes_cache'] = (notes_key, notes)
     if notes:
         st.sidebar.markdown("#### 🔔 Notifications")
         for n in notes:
@@ -487,26 +972,30 @@ def app():
     chat_q = st.sidebar.text_input("Ask (e.g. 'Recommend Python books')", key="chat_input")
     if st.sidebar.button("Ask", key="chat_btn"):
         if chat_q:
-            response = chatbot_response_for_user(current_user['email'], chat_q)
+            response = chatbot_response_for_user(current_email, chat_q)
             st.sidebar.info(response)
 
     # Navigation
-    if current_user['role']=="user":
+    if current_role=="user":
         page = st.sidebar.radio("Navigate", ["Dashboard","All Books","Favorites","Issued Books","Recommendations","Account","Logout"])
     else:
         page = st.sidebar.radio("Navigate", ["Dashboard","All Books","Add Book","Delete Book","Issued Overview","Account","Logout"])
 
     # ---------- Pages ----------
     if page=="Logout":
+        # session caches (notes/recs) go with session_state; also drop the
+        # memoized password digests so plaintext keys don't outlive the
+        # session. The stamp-keyed data indexes are process-wide, bounded
+        # by catalog size and still valid — they stay.
+        hash_password.cache_clear()
         st.session_state.clear()
         st.rerun()
 
     elif page=="Dashboard":
         st.header("📊 Dashboard")
-        users = get_users()
-        u = next((x for x in users if x['email'].lower()==current_user['email'].lower()), current_user)
+        u = users_by_email().get(current_email, current_user)
         st.write(f"- ⭐ Favorites: *{len(u.get('favorites', []))}*")
-        st.write(f"- 📥 Active borrowed books: *{len(user_active_issues(current_user['email']))}*")
+        st.write(f"- 📥 Active borrowed books: *{len(user_issued)}*")
 
     elif page=="All Books":
         st.header("📚 All Books")
@@ -514,18 +1003,24 @@ def app():
         q = st.text_input("Search by title / author / genre (press Enter)", key="search_books")
         filtered = all_books
         if q:
-            ql = q.lower()
-            filtered = [b for b in all_books if ql in b.get('title','').lower() or ql in b.get('author','').lower() or any(ql in g.lower() for g in b.get('genre',[]))]
-        for b in filtered:
-            book_card_ui(b, current_user['email'])
+            filtered = search_books(all_books, q)
+        # Paginate so widget count stays bounded regardless of catalog size.
+        total_pages = max(1, -(-len(filtered) // BOOKS_PER_PAGE))
+        page_no = st.number_input(f"Page (of {total_pages})", min_value=1, max_value=total_pages, value=1, key="books_page")
+        start = (page_no - 1) * BOOKS_PER_PAGE
+        page_books = filtered[start:start + BOOKS_PER_PAGE]
+        # One issued-records pass for the whole page instead of one per card.
+        active_ids = {r['book_id'] for r in user_issued}
+        for b in page_books:
+            book_card_ui(b, current_email, role=current_role, active_ids=active_ids)
             st.divider()
 
         if st.session_state.get('view_book'):
             bid = st.session_state['view_book']
-            b = next((x for x in all_books if x['id']==bid), None)
+            b = books_by_id(all_books).get(bid)
             if b:
                 st.subheader(f"📖 Detailed Overview: {b['title']}")
-                st.image(b.get('cover_url',''), width=150)
+                show_cover(b.get('cover_url',''), width=150)
                 st.markdown(f"*Author:* {b.get('author','')}")
                 st.markdown(f"*Genre:* {', '.join(b.get('genre',[]))}")
                 st.markdown("*Description:*")
@@ -538,33 +1033,55 @@ def app():
 
     elif page=="Favorites":
         st.header("⭐ Favorites")
-        fav_ids = current_user.get('favorites', [])
-        fav_books = [b for b in get_books() if b['id'] in fav_ids]
+        # O(favorites) resolution through the id index instead of testing
+        # every catalog book against the favorites list.
+        bidx = books_by_id()
+        fav_books = [bidx[i] for i in current_user.get('favorites', []) if i in bidx]
         if not fav_books: st.info("No favorites yet.")
+        # Same bounded-render treatment as All Books.
+        if len(fav_books) > BOOKS_PER_PAGE:
+            total_pages = -(-len(fav_books) // BOOKS_PER_PAGE)
+            page_no = st.number_input(f"Page (of {total_pages})", min_value=1, max_value=total_pages, value=1, key="favs_page")
+            fav_books = fav_books[(page_no - 1) * BOOKS_PER_PAGE:page_no * BOOKS_PER_PAGE]
+        active_ids = {r['book_id'] for r in user_issued}
         for b in fav_books:
-            book_card_ui(b, current_user['email'])
+            book_card_ui(b, current_email, role=current_role, active_ids=active_ids)
+            # single read + indexed lookup + one conditional write, same
+            # shape as the add-favorite handler
+            if st.button("💔 Remove from Favorites", key=f"unfav_{b['id']}_{current_email}"):
+                users = get_users()
+                u = users_by_email(users).get(current_email)
+                if u is not None and b['id'] in u.get('favorites', []):
+                    u['favorites'].remove(b['id'])
+                    save_users(users)
+                    st.session_state['user'] = {
+                        k: v for k, v in u.items() if k != 'password_hash'
+                    }
+                    flash(f"Removed '{b['title']}' from favorites.")
+                    st.rerun()
             st.divider()
 
     elif page=="Issued Books":
         st.header("📥 Issued Books")
-        active = user_active_issues(current_user['email'])
+        active = user_issued  # already fetched for the sidebar
         if not active:
             st.info("No active issues.")
-        for rec in active:
-            b = next((x for x in get_books() if x['id']==rec['book_id']), None)
+        bidx = books_by_id()
+        fines = fines_for_records(active)
+        for rec, fine_now in zip(active, fines):
+            b = bidx.get(rec['book_id'])
             if not b:
                 continue
             st.markdown(f"### {b['title']} by {b['author']}")
             st.write(f"*Issued on:* {rec['issue_date']}  |  *Due:* {rec['due_date']}")
-            fine_now = calculate_fine_for_record(rec)
             if fine_now > 0:
                 st.warning(f"⚠ Fine so far: ₹{fine_now}")
 
             # ✅ FIXED unique key for return button
-            if st.button("Return", key=f"return_{rec['book_id']}{current_user['email']}{rec['issue_date']}"):
-                ok, msg, fine = return_book_from_user(current_user['email'], rec['book_id'])
+            if st.button("Return", key=f"return_{rec['book_id']}{current_email}{rec['issue_date']}"):
+                ok, msg, fine = return_book_from_user(current_email, rec['book_id'])
                 if ok:
-                    st.success(f"{msg}. Fine: ₹{fine}")
+                    flash(f"{msg}. Fine: ₹{fine}")
                     st.rerun()
                 else:
                     st.error(msg)
@@ -572,13 +1089,22 @@ def app():
 
     elif page=="Recommendations":
         st.header("💡 Recommendations for you")
-        recs = recommend_for_user(current_user['email'], top_k=6)
+        # Skip re-ranking entirely while the inputs (catalog, ledger,
+        # favorites) are unchanged for this session.
+        rec_key = (_cache_stamp(BOOKS_FILE), _cache_stamp(ISSUED_FILE), tuple(current_user.get('favorites', [])))
+        cached_recs = st.session_state.get('recs_cache')
+        if cached_recs is not None and cached_recs[0] == rec_key:
+            recs = cached_recs[1]
+        else:
+            recs = recommend_for_user(current_email, top_k=6)
+            st.session_state['recs_cache'] = (rec_key, recs)
+        active_ids = {r['book_id'] for r in user_issued}
         for b in recs:
-            book_card_ui(b, current_user['email'])
+            book_card_ui(b, current_email, role=current_role, active_ids=active_ids)
             st.divider()
 
     # ---------- Librarian Pages ----------
-    elif page=="Add Book" and current_user['role']=="librarian":
+    elif page=="Add Book" and current_role=="librarian":
         st.header("➕ Add a New Book")
         title = st.text_input("Title")
         author = st.text_input("Author")
@@ -589,7 +1115,9 @@ def app():
 
         if st.button("Add Book"):
             books = get_books()
-            new_id = max([b['id'] for b in books], default=0) + 1
+            # max over the cached index's keys — no throwaway id list, and
+            # it only runs on the click, not per rerun
+            new_id = max(books_by_id(books), default=0) + 1
             new_book = {
                 "id": new_id,
                 "title": title.strip(),
@@ -606,7 +1134,7 @@ def app():
             save_books(books)
             st.success(f"Book '{title}' added successfully ✅")
 
-    elif page=="Delete Book" and current_user['role']=="librarian":
+    elif page=="Delete Book" and current_role=="librarian":
         st.header("🗑 Delete a Book")
         books = get_books()
         titles = {b['title']: b['id'] for b in books}
@@ -614,49 +1142,62 @@ def app():
         if choice and st.button("Delete"):
             books = [b for b in books if b['id'] != titles[choice]]
             save_books(books)
-            st.success(f"Book '{choice}' deleted successfully ✅")
+            flash(f"Book '{choice}' deleted successfully ✅")
             st.rerun()
 
-    elif page=="Issued Overview" and current_user['role']=="librarian":
+    elif page=="Issued Overview" and current_role=="librarian":
         st.header("📖 Issued Books Overview")
         issued = get_issued()
         if not issued:
             st.info("No issued books yet.")
         else:
-            for rec in issued:
-                b = next((x for x in get_books() if x['id']==rec['book_id']), None)
+            # the ledger grows without bound; render a bounded slice
+            if len(issued) > BOOKS_PER_PAGE:
+                total_pages = -(-len(issued) // BOOKS_PER_PAGE)
+                page_no = st.number_input(f"Page (of {total_pages})", min_value=1, max_value=total_pages, value=1, key="overview_page")
+                issued = issued[(page_no - 1) * BOOKS_PER_PAGE:page_no * BOOKS_PER_PAGE]
+            bidx = books_by_id()
+            fines = fines_for_records(issued)
+            for rec, fine_now in zip(issued, fines):
+                b = bidx.get(rec['book_id'])
                 if not b: continue
-                st.markdown(f"### {b['title']} by {b['author']}")
-                st.write(f"*Issued to:* {rec['user_email']}")
-                st.write(f"*Issued on:* {rec['issue_date']}  |  *Due:* {rec['due_date']}")
+                # one markdown delta per joined row
+                st.markdown(
+                    f"### {b['title']} by {b['author']}\n\n"
+                    f"*Issued to:* {rec['user_email']}\n\n"
+                    f"*Issued on:* {rec['issue_date']}  |  *Due:* {rec['due_date']}"
+                )
                 if rec['returned']:
                     st.success(f"✅ Returned on {rec['return_date']}")
                 else:
-                    fine_now = calculate_fine_for_record(rec)
                     if fine_now > 0:
                         st.warning(f"⚠ Overdue — Fine so far: ₹{fine_now}")
 
     elif page=="Account":
         st.header("👤 Account Details")
         st.write(f"*Name:* {current_user['name']}")
-        st.write(f"*Email:* {current_user['email']}")
+        st.write(f"*Email:* {current_email}")
         st.write(f"*Mobile:* {current_user['mobile']}")
-        st.write(f"*Role:* {current_user['role']}")
-        if st.button("Change Password", key="chg_pass_btn"):
+        st.write(f"*Role:* {current_role}")
+        # One form, one rerun: the old nested-button flow reran the page
+        # per field interaction (and the inner button could never survive
+        # the outer one's single True frame).
+        with st.form("change_password_form"):
             old = st.text_input("Current password", type="password", key="old_pass")
             new = st.text_input("New password", type="password", key="new_pass")
             confirm = st.text_input("Confirm new password", type="password", key="confirm_pass")
-            if st.button("Submit Password Change", key="submit_pass"):
-                users = get_users()
-                u = next((x for x in users if x['email'].lower()==current_user['email'].lower()), None)
-                if not u or u['password_hash'] != hash_password(old):
-                    st.error("Current password incorrect.")
-                elif new != confirm:
-                    st.error("New passwords do not match.")
-                else:
-                    u['password_hash'] = hash_password(new)
-                    save_users(users)
-                    st.success("Password changed successfully.")
+            submitted = st.form_submit_button("Change Password")
+        if submitted:
+            users = get_users()
+            u = users_by_email(users).get(current_email)
+            if not u or not verify_password(old, u['password_hash']):
+                st.error("Current password incorrect.")
+            elif new != confirm:
+                st.error("New passwords do not match.")
+            else:
+                u['password_hash'] = make_password_hash(new)
+                save_users(users)
+                st.success("Password changed successfully.")
 
 # -------------------------
 # Entry point